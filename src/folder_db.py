@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from functools import lru_cache
 from pathlib import Path
+import os
 import sys
+from typing import Final
 
 
 @dataclass(frozen=True)
@@ -16,14 +17,7 @@ class ProjectPaths:
     parsed_beh: Path
 
 
-@lru_cache(maxsize=1)
-def get_project_paths(root: Path | None = None) -> ProjectPaths:
-    """
-    Return resolved paths for the project.
-
-    If root is not provided, it is inferred from the location of this file.
-    """
-    base = Path(root).resolve() if root else Path(__file__).resolve().parent.parent
+def _compute_paths(base: Path) -> ProjectPaths:
     data_dir = base / "data"
     return ProjectPaths(
         root=base,
@@ -33,8 +27,20 @@ def get_project_paths(root: Path | None = None) -> ProjectPaths:
     )
 
 
-# Ready-to-use namespace with default project root.
-PATHS = get_project_paths()
+# Ready-to-use namespace with default project root, computed once at import.
+PATHS: Final[ProjectPaths] = _compute_paths(Path(__file__).resolve().parent.parent)
+_ROOT_STR: Final[str] = str(PATHS.root)
+
+
+def get_project_paths(root: Path | None = None) -> ProjectPaths:
+    """
+    Return resolved paths for the project.
+
+    If root is not provided, the module-level PATHS for the inferred root is returned.
+    """
+    if not root:
+        return PATHS
+    return _compute_paths(Path(root).resolve())
 
 
 def add_project_root_to_syspath(position: int = 0) -> Path:
@@ -46,10 +52,9 @@ def add_project_root_to_syspath(position: int = 0) -> Path:
     position : int
         Index to insert the project root in sys.path (defaults to the front).
     """
-    root_str = str(PATHS.root)
-    if root_str not in sys.path:
+    if _ROOT_STR not in sys.path:
         insert_at = max(position, 0)
-        sys.path.insert(insert_at, root_str)
+        sys.path.insert(insert_at, _ROOT_STR)
     return PATHS.root
 
 
@@ -57,7 +62,9 @@ add_project_root_to_syspath()
 
 
 def list_immediate_subdirs(path: Path) -> list[str]:
-    return sorted(p.name for p in path.iterdir() if p.is_dir())
+    # DirEntry.is_dir() reuses the type from the directory listing, avoiding a stat per entry.
+    with os.scandir(path) as it:
+        return sorted(entry.name for entry in it if entry.is_dir())
 
 
 def main() -> None:
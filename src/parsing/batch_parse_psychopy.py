@@ -3,9 +3,12 @@ from __future__ import annotations
 """Batch parser for PsychoPy log files that saves CSV outputs in bulk."""
 
 import argparse
+import fnmatch
+import os
 import sys
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 try:
     from ..folder_db import PATHS
@@ -31,78 +34,160 @@ def _target_csv_path(log_path: Path, output_dir: Path) -> Path:
         csv_name = log_path.stem + ".csv"
     return output_dir / csv_name
 
+def _is_up_to_date(log_path: Path, csv_path: Path) -> bool:
+    """
+    Return True if csv_path exists and is at least as new as log_path.
+
+    Any stat failure counts as out of date, so the file goes through the normal
+    parse path and a missing or unreadable log is reported as a per-file error.
+    """
+    try:
+        return os.stat(csv_path).st_mtime >= os.stat(log_path).st_mtime
+    except OSError:
+        return False
+
+def _find_log_files(input_dir: Path, pattern: str) -> List[Path]:
+    """
+    Return sorted regular files under input_dir matching pattern, searched recursively.
+
+    Plain filename globs are matched against entry names during an os.scandir walk.
+    Patterns with a path part (a separator or "**") go through Path.rglob so they
+    keep their relative-to-input_dir meaning.
+    """
+    if "/" in pattern or os.sep in pattern or "**" in pattern:
+        return sorted({p for p in input_dir.rglob(pattern) if p.is_file()})
+
+    matches = []
+    pending = [input_dir]
+    while pending:
+        try:
+            it = os.scandir(pending.pop())
+        except OSError:  # Unreadable directory: skip it, as os.walk would
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                # is_file() follows symlinks, so dangling links are dropped.
+                elif fnmatch.fnmatch(entry.name, pattern) and entry.is_file():
+                    matches.append(Path(entry.path))
+    return sorted(matches)
+
+def _parse_one(
+    log_path: Path,
+    output_dir: Path,
+    overwrite: bool,
+    dry_run: bool,
+    expected_trials: int | None = None,
+) -> Dict[str, str]:
+    """
+    Parse a single log file and write its CSV.
+
+    Kept at module level so it can be pickled for worker processes.
+    Returns a result dict with keys: log, csv, status, and optionally error/trials.
+    """
+    csv_path = _target_csv_path(log_path, output_dir)
+
+    if not overwrite and _is_up_to_date(log_path, csv_path):
+        return {
+            "log": str(log_path),
+            "csv": str(csv_path),
+            "status": "skipped",
+            "reason": "up-to-date",
+        }
+
+    if dry_run:
+        return {
+            "log": str(log_path),
+            "csv": str(csv_path),
+            "status": "dry-run",
+        }
+
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        trials = parse_psychopy.parse_time_interval_log(log_path, expected_trials)
+        parse_psychopy.save_trials_to_csv(trials, csv_path)
+        return {
+            "log": str(log_path),
+            "csv": str(csv_path),
+            "status": "ok",
+            "trials": str(len(trials)),
+        }
+    except Exception as exc:  # noqa: BLE001 - want to record any failure
+        return {
+            "log": str(log_path),
+            "csv": str(csv_path),
+            "status": "error",
+            "error": str(exc),
+        }
+
+def _parse_one_star(args: Tuple[Path, Path, bool, bool, int | None]) -> Dict[str, str]:
+    """Unpack a task tuple for Pool.imap_unordered."""
+    return _parse_one(*args)
+
 def batch_parse_logs(
     input_dir: Path | None = None,
     output_dir: Path | None = None,
     pattern: str = "*.log*",
     overwrite: bool = False,
     dry_run: bool = False,
+    jobs: int | None = None,
+    expected_trials: int | None = None,
 ) -> List[Dict[str, str]]:
     """
     Parse all matching log files under input_dir and write CSVs to output_dir.
 
     By default, uses folder_db.PATHS to pull the raw/parsed behavioral folders.
+    Files are parsed in parallel across `jobs` worker processes (must be >= 1);
+    None means one per CPU and jobs=1 parses serially in the current process.
+    If expected_trials is given, each log is only read up to that many trials.
     Returns a list of result dicts with keys: log, csv, status, and optionally error/trials.
     """
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"jobs must be a positive integer, got {jobs}")
+
     input_dir = Path(input_dir).resolve() if input_dir else DEFAULT_INPUT_DIR
     output_dir = Path(output_dir).resolve() if output_dir else DEFAULT_OUTPUT_DIR
 
     if not input_dir.exists():
         raise FileNotFoundError(f"Input directory does not exist: {input_dir}")
 
-    log_paths = sorted({p for p in input_dir.rglob(pattern) if p.is_file()})
-    results: List[Dict[str, str]] = []
-
-    for log_path in log_paths:
-        csv_path = _target_csv_path(log_path, output_dir)
-
-        if csv_path.exists() and not overwrite:
-            results.append(
-                {
-                    "log": str(log_path),
-                    "csv": str(csv_path),
-                    "status": "skipped",
-                    "reason": "exists",
-                }
-            )
-            continue
+    log_paths = _find_log_files(input_dir, pattern)
 
-        if dry_run:
-            results.append(
-                {
-                    "log": str(log_path),
-                    "csv": str(csv_path),
-                    "status": "dry-run",
-                }
-            )
-            continue
+    if jobs == 1 or len(log_paths) <= 1:
+        return [
+            _parse_one(p, output_dir, overwrite, dry_run, expected_trials)
+            for p in log_paths
+        ]
 
-        csv_path.parent.mkdir(parents=True, exist_ok=True)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    workers = min(jobs, len(log_paths))
+    # Batch several small files per task so IPC overhead does not dominate.
+    chunksize = max(1, len(log_paths) // (4 * workers))
+    tasks = [(p, output_dir, overwrite, dry_run, expected_trials) for p in log_paths]
 
-        try:
-            trials = parse_psychopy.parse_time_interval_log(str(log_path))
-            parse_psychopy.save_trials_to_csv(trials, str(csv_path))
-            results.append(
-                {
-                    "log": str(log_path),
-                    "csv": str(csv_path),
-                    "status": "ok",
-                    "trials": str(len(trials)),
-                }
-            )
-        except Exception as exc:  # noqa: BLE001 - want to record any failure
-            results.append(
-                {
-                    "log": str(log_path),
-                    "csv": str(csv_path),
-                    "status": "error",
-                    "error": str(exc),
-                }
-            )
+    with Pool(processes=workers) as pool:
+        results = list(pool.imap_unordered(_parse_one_star, tasks, chunksize=chunksize))
 
+    # Restore input order, since workers finish in arbitrary order.
+    order = {str(p): i for i, p in enumerate(log_paths)}
+    results.sort(key=lambda r: order[r["log"]])
     return results
 
 
+def _positive_int(value: str) -> int:
+    """argparse type for options that must be an integer >= 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {number}")
+    return number
+
+
 def _print_summary(results: List[Dict[str, str]]) -> None:
     ok = [r for r in results if r["status"] == "ok"]
     skipped = [r for r in results if r["status"] == "skipped"]
@@ -153,13 +238,26 @@ def main(argv: List[str] | None = None) -> None:
     parser.add_argument(
         "--overwrite",
         action="store_true",
-        help="Rewrite CSVs even if they already exist.",
+        help="Rewrite CSVs even if they are newer than their log files.",
     )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="List what would be done without writing files.",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=None,
+        type=_positive_int,
+        help="Number of worker processes (>= 1; 1 parses serially). Default: number of CPUs.",
+    )
+    parser.add_argument(
+        "--expected-trials",
+        default=None,
+        type=_positive_int,
+        help="Stop reading each log after this many trials (>= 1). Default: read to the end.",
+    )
 
     args = parser.parse_args(argv)
 
@@ -169,6 +267,8 @@ def main(argv: List[str] | None = None) -> None:
         pattern=args.pattern,
         overwrite=args.overwrite,
         dry_run=args.dry_run,
+        jobs=args.jobs,
+        expected_trials=args.expected_trials,
     )
     _print_summary(results)
 
@@ -1,91 +1,178 @@
+import io
+import bisect
 import os
 import re
-import csv
-import gzip
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from isal import igzip as _gzip
+except ImportError:  # Fallback to the standard library decompressor
+    import gzip as _gzip
+
+_GZIP_READ_BUFFER_SIZE = 128 * 1024
+_KEYDOWN_PREFIX = "Keydown:"
+# A choice key counts if pressed up to this many seconds after the response offset.
+_RESPONSE_GRACE_S = 1.0
+_STIM_NAMES = ("firstImg", "secondImg", "responseImg")
+_AUTODRAW_RE = re.compile(rf"({'|'.join(_STIM_NAMES)}): autoDraw = (true|null)")
+_FILENAME_DT_RE = re.compile(r"(\d{4}-\d{2}-\d{2})_(\d{2})h(\d{2})\.(\d{2})\.(\d{3})")
+
+TRIAL_FIELDNAMES = (
+    "experiment_date",
+    "experiment_time",
+    "stim1_onset",
+    "stim1_offset",
+    "stim2_onset",
+    "stim2_offset",
+    "stim1_duration",
+    "stim2_duration",
+    "stim_dur_delta",
+    "choice_key",
+    "choice_time",
+    "choice_rt",
+)
 
 # ---------------------------
 # Helpers to read PsychoPy log
 # ---------------------------
 
+def open_log(log_path):
+    """Open a .log or .log.gz file (str or Path) for text reading."""
+    if os.fspath(log_path).endswith(".gz"):
+        # A large buffer means fewer, bigger reads into the decompressor.
+        raw = _gzip.open(log_path, "rb")
+        buf = io.BufferedReader(raw, buffer_size=_GZIP_READ_BUFFER_SIZE)
+        return io.TextIOWrapper(buf, encoding="utf-8", errors="replace")
+    return open(log_path, "rt", encoding="utf-8", errors="replace")
+
 def iter_log_events(log_path):
     """Yield (time, event_type, message) for each proper log line."""
-    opener = gzip.open if log_path.endswith(".gz") else open
-    with opener(log_path, "rt", encoding="utf-8", errors="replace") as f:
+    with open_log(log_path) as f:
         for line in f:
-            parts = line.rstrip("\n").split("\t")
-            if len(parts) < 3:
+            time_str, sep, rest = line.partition("\t")
+            if not sep:
+                continue
+            etype, sep, msg = rest.partition("\t")
+            if not sep:
                 continue
             try:
-                t = float(parts[0])
+                t = float(time_str)
             except ValueError:
                 continue
-            yield t, parts[1], parts[2]
+            # Only the third field is the message; drop any trailing fields.
+            yield t, etype, msg.partition("\t")[0].rstrip("\n")
 
 def extract_experiment_datetime(log_path):
     """Return experiment date/time parsed from the log filename."""
-    filename = os.path.basename(log_path)
-    m = re.search(r"(\d{4}-\d{2}-\d{2})_(\d{2})h(\d{2})\.(\d{2})\.(\d{3})", filename)
+    filename = log_path.name if isinstance(log_path, Path) else os.path.basename(log_path)
+    m = _FILENAME_DT_RE.search(filename)
     if not m:
         raise ValueError(f"Could not extract experiment datetime from filename: {filename}")
     date_part, hour, minute, second, ms = m.groups()
     time_part = f"{hour}:{minute}:{second}.{ms}"
     return {"experiment_date": date_part, "experiment_time": time_part}
 
-def extract_periods(events, stim_name):
-    """Extract (onset, offset) periods for stimuli based on autoDraw true/null."""
-    on = None
-    periods = []
+def extract_periods_and_keys(events, expected_trials=None):
+    """
+    Extract stimulus (onset, offset) periods and key presses in a single pass.
+
+    Periods are delimited by autoDraw true/null messages. Returns a dict mapping
+    each name in _STIM_NAMES to its list of periods, and a list of (time, key).
+    If expected_trials is given, stop reading once that many response periods
+    are closed, no stimulus is on screen, and the last response window has passed.
+    """
+    onsets = dict.fromkeys(_STIM_NAMES)
+    periods = {name: [] for name in _STIM_NAMES}
+    response_periods = periods["responseImg"]
+    key_events = []
+    stop_after = None
     for t, etype, msg in events:
-        if f"{stim_name}: autoDraw = true" in msg and on is None:
-            on = t
-        elif f"{stim_name}: autoDraw = null" in msg and on is not None:
-            periods.append((on, t))
-            on = None
-    return periods
+        if stop_after is not None and t > stop_after:
+            break
+        if etype == "DATA" and msg.startswith(_KEYDOWN_PREFIX):
+            key_events.append((t, msg[len(_KEYDOWN_PREFIX):].lstrip()))
+            continue
+        if "autoDraw = " not in msg:
+            continue
+        m = _AUTODRAW_RE.search(msg)
+        if not m:
+            continue
+        name, state = m.groups()
+        if state == "true":
+            if onsets[name] is None:
+                onsets[name] = t
+        elif onsets[name] is not None:
+            periods[name].append((onsets[name], t))
+            onsets[name] = None
+            if (
+                expected_trials is not None
+                and response_periods
+                and len(response_periods) >= expected_trials
+                and all(on is None for on in onsets.values())
+            ):
+                stop_after = response_periods[-1][1] + _RESPONSE_GRACE_S
+    return periods, key_events
 
 # ---------------------------
 # Main parsing logic
 # ---------------------------
 
-def parse_time_interval_log(log_path):
-    events = list(iter_log_events(log_path))
+def parse_time_interval_log(log_path, expected_trials=None):
+    """
+    Parse a .log or .log.gz file (str or Path) into a DataFrame of trials.
+
+    If the number of trials is known, pass expected_trials to stop reading the
+    log after the last trial instead of scanning trailing end-of-session events.
+    expected_trials must be >= 1 when given.
+    """
+    if expected_trials is not None and expected_trials < 1:
+        raise ValueError(f"expected_trials must be a positive integer, got {expected_trials}")
+
     metadata = extract_experiment_datetime(log_path)
 
-    # Extract onset/offset periods
-    first_periods = extract_periods(events, "firstImg")
-    second_periods = extract_periods(events, "secondImg")
-    response_periods = extract_periods(events, "responseImg")
+    periods, key_events = extract_periods_and_keys(iter_log_events(log_path), expected_trials)
+    first_periods = periods["firstImg"]
+    second_periods = periods["secondImg"]
+    response_periods = periods["responseImg"]
 
-    # Key responses
-    key_events = []
-    for t, etype, msg in events:
-        if etype == "DATA":
-            m = re.match(r"Keydown:\s*(.*)", msg)
-            if m:
-                key_events.append((t, m.group(1)))
+    # Log lines are chronological, so key times are sorted and can be bisected.
+    key_times = [t for t, _ in key_events]
 
-    trials = []
     n = min(len(first_periods), len(second_periods), len(response_periods))
 
+    # Columns are preallocated to length n and filled by index.
+    first = np.asarray(first_periods[:n], dtype=float).reshape(n, 2)
+    second = np.asarray(second_periods[:n], dtype=float).reshape(n, 2)
+    stim1_on, stim1_off = first[:, 0], first[:, 1]
+    stim2_on, stim2_off = second[:, 0], second[:, 1]
+    resp_on = np.empty(n)
+    choice_keys = [None] * n
+    choice_times = np.full(n, np.nan)
+
     for i in range(n):
-        stim1_on, stim1_off = first_periods[i]
-        stim2_on, stim2_off = second_periods[i]
-        resp_on, resp_off = response_periods[i]
-
-        stim1_dur = stim1_off - stim1_on
-        stim2_dur = stim2_off - stim2_on
-        delta = stim1_dur - stim2_dur
-
-        choice_key = None
-        choice_time = None
-        for t, key in key_events:
-            if key in ("1", "2") and resp_on <= t <= resp_off + 1.0:
-                choice_key = key
-                choice_time = t
+        r_on, r_off = response_periods[i]
+        resp_on[i] = r_on
+
+        lo = bisect.bisect_left(key_times, r_on)
+        hi = bisect.bisect_right(key_times, r_off + _RESPONSE_GRACE_S)
+        for j in range(lo, hi):
+            key = key_events[j][1]
+            if key in ("1", "2"):
+                choice_keys[i] = key
+                choice_times[i] = key_times[j]
                 break
-        choice_rt = choice_time - resp_on if choice_time is not None else None
 
-        trials.append({
+    # Durations and reaction times are computed column-wise; a missing choice
+    # stays NaN through the subtraction.
+    stim1_dur = stim1_off - stim1_on
+    stim2_dur = stim2_off - stim2_on
+
+    return pd.DataFrame(
+        {
+            # Constant per file: pandas broadcasts the scalars to full columns.
             "experiment_date": metadata["experiment_date"],
             "experiment_time": metadata["experiment_time"],
             "stim1_onset": stim1_on,
@@ -94,37 +181,20 @@ def parse_time_interval_log(log_path):
             "stim2_offset": stim2_off,
             "stim1_duration": stim1_dur,
             "stim2_duration": stim2_dur,
-            "stim_dur_delta": delta,
-            "choice_key": choice_key,
-            "choice_time": choice_time,
-            "choice_rt": choice_rt,
-        })
-
-    return trials
+            "stim_dur_delta": stim1_dur - stim2_dur,
+            "choice_key": pd.Series(choice_keys, dtype=object),
+            "choice_time": choice_times,
+            "choice_rt": choice_times - resp_on,
+        },
+        columns=TRIAL_FIELDNAMES,
+    )
 
 def save_trials_to_csv(trials, csv_path):
-    if not trials:
+    if trials.empty:
         raise ValueError("No trials parsed.")
 
-    fieldnames = [
-        "experiment_date",
-        "experiment_time",
-        "stim1_onset",
-        "stim1_offset",
-        "stim2_onset",
-        "stim2_offset",
-        "stim1_duration",
-        "stim2_duration",
-        "stim_dur_delta",
-        "choice_key",
-        "choice_time",
-        "choice_rt",
-    ]
-
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(trials)
+    # Missing values are written as empty cells, rows end in \r\n like csv.writer.
+    trials.to_csv(csv_path, index=False, lineterminator="\r\n", encoding="utf-8")
 
 # ---------------------------
 # Example usage